@@ -7,3 +7,27 @@ try:
     _xrange = xrange
 except NameError:
     _xrange = range
+
+# Optional fast JSON codec. orjson and ujson are C extensions that serialize
+# and parse severalfold faster than the stdlib json module; use whichever is
+# installed, falling back to stdlib json. json_dumps always returns bytes.
+try:
+    import orjson
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+    fast_json = True
+except ImportError:
+    try:
+        import ujson
+
+        def json_dumps(obj):
+            return ujson.dumps(obj).encode('utf-8')
+        json_loads = ujson.loads
+        fast_json = True
+    except ImportError:
+        import json
+
+        def json_dumps(obj):
+            return json.dumps(obj).encode('utf-8')
+        json_loads = json.loads
+        fast_json = False
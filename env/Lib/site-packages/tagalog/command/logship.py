@@ -8,7 +8,7 @@ from tagalog import io
 from tagalog import filters
 from tagalog.shipper import build_shipper
 
-DEFAULT_FILTERS = 'init_txt,add_timestamp,add_source_host'
+DEFAULT_FILTERS = filters.DEFAULT_FILTERS
 
 parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
     description=textwrap.dedent("""
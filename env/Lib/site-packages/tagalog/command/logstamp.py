@@ -6,8 +6,13 @@ from tagalog.filters import now
 
 
 def main():
+    # Buffered binary writes: print() would issue one syscall per line on
+    # line-buffered stdout.
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    write = out.write
     for msg in io.lines(sys.stdin):
-        print(now(), msg, end='')
+        write(('%s %s' % (now(), msg)).encode('utf-8'))
+    out.flush()
 
 if __name__ == '__main__':
     main()
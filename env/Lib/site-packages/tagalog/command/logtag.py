@@ -1,13 +1,12 @@
 from __future__ import print_function
 import argparse
-import csv
-import json
 import sys
 import textwrap
 
 from tagalog import io, filters
+from tagalog._compat import json_dumps
 
-DEFAULT_FILTERS = 'init_txt,add_timestamp,add_source_host'
+DEFAULT_FILTERS = filters.DEFAULT_FILTERS
 
 parser = argparse.ArgumentParser(description="Convert log data on STDIN to a "
                                              "stream of timestamped JSON "
@@ -26,8 +25,15 @@ def main():
         filterlist.extend(args.filters_append)
     pipeline = filters.build(','.join(filterlist))
 
+    # Write onto the underlying buffered binary stream rather than print()ing:
+    # one buffered write per line avoids a syscall per line when stdout is a
+    # pipe or file.
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    write = out.write
     for msg in pipeline(io.lines(sys.stdin)):
-        print(json.dumps(msg))
+        write(json_dumps(msg))
+        write(b'\n')
+    out.flush()
 
 
 if __name__ == '__main__':
@@ -8,17 +8,28 @@ and optionally takes additional configuration arguments. It returns a generator
 yielding the filtered log lines.
 """
 
-import csv
-import datetime
 import itertools
-import json
+import re
 import socket
 import logging
+import time
+from functools import partial
+
+from tagalog._compat import json_loads
 
 FILTERS = {}
 
 log = logging.getLogger(__name__)
 
+# The FQDN can involve a DNS lookup, so resolve it once at import time rather
+# than once per add_source_host invocation.
+_SOURCE_HOST = socket.getfqdn()
+
+# One C-level regex scan per message is cheaper than splitting into tokens and
+# re-splitting each token on '='. The lazy key group stops at the first '=',
+# matching the previous split('=', 1) behaviour.
+_LOGRAGE_RE = re.compile(r'(\S+?)=(\S*)')
+
 class FilterError(Exception):
     pass
 
@@ -50,21 +61,111 @@ def pipeline(*functions):
     >>> [x for x in data_out]
     ['foo:a:b', 'bar:a:b']
     """
-    head = functions[0]
-    tail = functions[1:]
-    if tail:
-        def _fn(iterable):
-            for i in pipeline(*tail)(head(iterable)):
-                yield i
-        return _fn
-    else:
-        return head
+    def _fn(iterable):
+        for f in functions:
+            iterable = f(iterable)
+        return iterable
+    return _fn
+
+
+# Code templates used by _fuse() to compile a filter chain into a single
+# generated loop. ``_INIT_TEMPLATES`` consume the raw ``line``; ``_ITEM_TEMPLATES``
+# transform the ``item`` dict in place. Only argument-less invocations can be
+# fused -- anything else falls back to the generic generator pipeline.
+_INIT_TEMPLATES = {
+    'init_txt': "item = {'@message': line.rstrip('\\n')}",
+    'init_json': """try:
+    item = json_loads(line)
+except ValueError as e:
+    log.warn('init_json: could not parse JSON message "{0}"'.format(line))
+    log.warn('init_json: error was "{0}"'.format(e))
+    continue
+if not isinstance(item, dict):
+    log.warn('init_json: skipping message "{0}" (not a JSON object)'.format(line))
+    continue""",
+}
+
+_ITEM_TEMPLATES = {
+    'add_timestamp': """if '@timestamp' not in item:
+    item['@timestamp'] = now()""",
+    'add_source_host': """if '@source_host' not in item:
+    item['@source_host'] = source_host""",
+    'parse_lograge': """if '@message' not in item:
+    log.warn('parse_lograge: skipping item missing "@message" key ("{0}")'.format(item))
+    continue
+if '@fields' not in item:
+    item['@fields'] = {}
+item['@fields'].update(lograge_findall(item['@message']))""",
+}
+
+
+def _fuse(parsed):
+    """
+    Compile a parsed filter chain into a single generated generator function.
+
+    Each generator stage in a pipeline costs one ``yield``/``next`` pair per
+    log line; fusing the stages into one loop removes that interpreter
+    overhead on the hot path. Returns ``None`` when the chain cannot be fused
+    (a stage takes arguments, or has no code template), in which case the
+    caller should fall back to :func:`pipeline`.
+    """
+    head, tail = parsed[0], parsed[1:]
+    if head[1] or head[0] not in _INIT_TEMPLATES:
+        return None
+    for name, args in tail:
+        if args or name not in _ITEM_TEMPLATES:
+            return None
+
+    src = ['def _fused(iterable):', '    for line in iterable:']
+    src.extend(_indent(_INIT_TEMPLATES[head[0]]))
+    for name, _ in tail:
+        src.extend(_indent(_ITEM_TEMPLATES[name]))
+    src.append('        yield item')
+
+    namespace = {'json_loads': json_loads,
+                 'lograge_findall': _LOGRAGE_RE.findall,
+                 'log': log,
+                 'now': now,
+                 'source_host': _SOURCE_HOST}
+    exec('\n'.join(src), namespace)
+    return namespace['_fused']
+
+
+def _indent(template):
+    return ['        ' + line for line in template.split('\n')]
+
+
+# The default chain used by logtag/logship. It is common enough to deserve a
+# hand-fused fast path in build() that skips parsing and codegen entirely.
+DEFAULT_FILTERS = 'init_txt,add_timestamp,add_source_host'
+
+
+def _default_chain(iterable):
+    ts = now
+    source_host = _SOURCE_HOST
+    for line in iterable:
+        yield {'@message': line.rstrip('\n'),
+               '@timestamp': ts(),
+               '@source_host': source_host}
 
 
 def build(description):
     """Build a filter chain from a filter description string"""
-    filters = next(csv.reader([description]))
-    filter_funcs = [get(f[0], f[1:]) for f in csv.reader(filters, delimiter=':')]
+    if description == DEFAULT_FILTERS:
+        return _default_chain
+    # Descriptions never contain quoting, so plain str.split beats dragging a
+    # csv.reader state machine through them.
+    parsed = []
+    for f in description.split(','):
+        parts = f.split(':')
+        parsed.append((parts[0], parts[1:]))
+    for name, _ in parsed:
+        if name not in FILTERS:
+            raise FilterError('No such filter: {0}'.format(name))
+    fused = _fuse(parsed)
+    if fused is not None:
+        return fused
+    filter_funcs = [get(name, args) for name, args in parsed]
     return pipeline(*filter_funcs)
 
 
@@ -87,12 +188,18 @@ def get(name, args=[]):
         else:
             f_kwargs[a[0]] = a[1]
 
-    # Construct the curried filter function
-    def _filterfunc(iterable):
-        for item in f(iterable, *f_args, **f_kwargs):
-            yield item
+    # Bind the parsed arguments at construction time. Unlike the old
+    # forwarding generator this adds no extra frame per item: calling the
+    # result IS the filter generator. Positional arguments follow the
+    # iterable in filter signatures, so they cannot be bound with partial.
+    if not f_args and not f_kwargs:
+        return f
+    if not f_args:
+        return partial(f, **f_kwargs)
 
-    return _filterfunc
+    def _bound(iterable):
+        return f(iterable, *f_args, **f_kwargs)
+    return _bound
 
 
 def init_txt(iterable):
@@ -124,7 +231,7 @@ def init_json(iterable):
     """
     for line in iterable:
         try:
-            item = json.loads(line)
+            item = json_loads(line)
         except ValueError as e:
             log.warn('init_json: could not parse JSON message "{0}"'.format(line))
             log.warn('init_json: error was "{0}"'.format(e))
@@ -176,7 +283,7 @@ def add_source_host(iterable, override=False):
      {'@source_host': 'lynx.local', '@message': 'another message'}]
     """
     k = '@source_host'
-    source_host = socket.getfqdn()
+    source_host = _SOURCE_HOST
     for item in iterable:
         if override or k not in item:
             item[k] = source_host
@@ -216,12 +323,16 @@ def add_tags(iterable, *taglist):
      {'@message': 'another message', '@tags': ['foo', 'bar']}]
     """
     k = '@tags'
+    taglist = list(taglist)
     for item in iterable:
-        try:
-            item[k].extend(taglist)
-        except (AttributeError, KeyError):
-            item[k] = []
-            item[k].extend(taglist)
+        # No try/except on the hot path: a handler setup costs even when no
+        # exception fires, and the missing-key case fired one per item.
+        existing = item.get(k)
+        if isinstance(existing, list):
+            existing.extend(taglist)
+        else:
+            # absent or not a list: replace, as the except branch used to
+            item[k] = list(taglist)
         yield item
 FILTERS['add_tags'] = add_tags
 
@@ -239,25 +350,37 @@ def parse_lograge(iterable):
     [{'@fields': {'status': '200', 'path': '/foo/bar', 'time': '0.060'}, '@message': 'path=/foo/bar status=200 time=0.060'},
      {'@fields': {'status': '503', 'path': '/baz/qux', 'time': '1.651'}, '@message': 'path=/baz/qux status=503 time=1.651'}]
     """
+    # Bind hot names to locals: this loop runs once per log line and local
+    # loads are significantly cheaper than global/attribute lookups.
+    findall = _LOGRAGE_RE.findall
+    warn = log.warn
     for item in iterable:
         if '@message' not in item:
-            log.warn('parse_lograge: skipping item missing "@message" key ("{0}")'.format(item))
+            warn('parse_lograge: skipping item missing "@message" key ("{0}")'.format(item))
             continue
         if '@fields' not in item:
             item['@fields'] = {}
-        for kv in item['@message'].split():
-            ret = kv.split('=', 1)
-            if len(ret) == 2:
-                item['@fields'][ret[0]] = ret[1]
+        item['@fields'].update(findall(item['@message']))
         yield item
 FILTERS['parse_lograge'] = parse_lograge
 
 
-def now():
-    return _now().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+# now() runs once per log line, so avoid datetime allocation and strftime
+# format-string parsing. The date-and-time prefix only changes once a second
+# and is cached; repeat calls within the same second just format microseconds.
+_now_second = None
+_now_prefix = ''
 
 
-def _now():
-    return datetime.datetime.utcnow()
+def now():
+    global _now_second, _now_prefix
+    t = time.time()
+    sec = int(t)
+    if sec != _now_second:
+        tm = time.gmtime(sec)
+        _now_prefix = '%04d-%02d-%02dT%02d:%02d:%02d.' % (
+            tm.tm_year, tm.tm_mon, tm.tm_mday, tm.tm_hour, tm.tm_min, tm.tm_sec)
+        _now_second = sec
+    return '%s%06dZ' % (_now_prefix, int((t - sec) * 1000000))
 
 
@@ -1,57 +1,53 @@
 from __future__ import unicode_literals
-import os
-import sys
 
 UTF8 = 'UTF-8'
 
-BUF_DEFAULT = -1
-BUF_UNBUFFERED = 0
-BUF_LINEBUFFERED = 1
+CHUNK_SIZE = 65536
 
 
-def lines(fp):
+def lines(fp, chunk_size=CHUNK_SIZE):
     """
-    Read lines of UTF-8 from the file-like object given in ``fp``, making sure
-    that when reading from STDIN, reads are at most line-buffered.
+    Read lines of UTF-8 from the file-like object given in ``fp``. Input is
+    consumed in large chunks and split on newlines at C speed with
+    ``bytes.splitlines``, rather than through Python's per-line file
+    iteration. When the stream supports ``read1`` (as STDIN does), a chunk is
+    yielded as soon as data is available rather than blocking until a full
+    chunk accumulates.
 
     UTF-8 decoding errors are handled silently. Invalid characters are
     replaced by U+FFFD REPLACEMENT CHARACTER.
 
-    Line endings are normalised to newlines by Python's universal newlines
-    feature.
+    Line endings are normalised to newlines.
 
     Returns an iterator yielding lines.
     """
-    if fp.fileno() == sys.stdin.fileno():
-        close = True
-
-        try: # Python 3
-            fp = open(fp.fileno(), mode='r', buffering=BUF_LINEBUFFERED, errors='replace')
-            decode = False
-        except TypeError:
-            fp = os.fdopen(fp.fileno(), 'rU', BUF_LINEBUFFERED)
-            decode = True
-
-    else:
-        close = False
-
-        try:
-            # only decode if the fp doesn't already have an encoding
-            decode = (fp.encoding != UTF8)
-        except AttributeError:
-            # fp has been opened in binary mode
-            decode = True
-
-    try:
-        while 1:
-            l = fp.readline()
-            if l:
-                if decode:
-                    l = l.decode(UTF8, 'replace')
-                yield l
-            else:
-                break
-    finally:
-        if close:
-            fp.close()
-
+    raw = getattr(fp, 'buffer', fp)
+    read = getattr(raw, 'read1', raw.read)
+    tail = b''
+    while 1:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode(UTF8)
+        tail += chunk
+        parts = tail.splitlines(True)
+        # Hold back any unterminated trailing data -- including a bare '\r'
+        # that may be the first half of a '\r\n' pair -- for the next chunk.
+        if parts[-1].endswith(b'\n'):
+            tail = b''
+        else:
+            tail = parts.pop()
+        for part in parts:
+            yield _decode_line(part)
+    if tail:
+        yield _decode_line(tail)
+
+
+def _decode_line(raw_line):
+    """Decode one raw line, normalising its line ending (if any) to a newline"""
+    if raw_line.endswith(b'\r\n'):
+        return raw_line[:-2].decode(UTF8, 'replace') + '\n'
+    elif raw_line.endswith(b'\n') or raw_line.endswith(b'\r'):
+        return raw_line[:-1].decode(UTF8, 'replace') + '\n'
+    return raw_line.decode(UTF8, 'replace')
@@ -1,14 +1,42 @@
-import json
+from tagalog._compat import fast_json, json_dumps
+
+if not fast_json:
+    # Stdlib-json fallback: messages share a handful of key layouts
+    # (@message/@timestamp/@source_host/...), yet json.dumps re-encodes and
+    # escape-scans those constant keys on every call. Cache a %-template per
+    # key layout so only the values are JSON-encoded per message.
+    import json as _json
+
+    _shape_templates = {}
+
+    def _template_dumps(msg):
+        keys = tuple(msg)
+        tpl = _shape_templates.get(keys)
+        if tpl is None:
+            tpl = '{%s}' % ','.join(
+                '%s:%%s' % _json.dumps(k).replace('%', '%%') for k in keys)
+            _shape_templates[keys] = tpl
+        return (tpl % tuple(_json.dumps(v) for v in msg.values())).encode('utf-8')
 
 
 def elasticsearch_bulk_decorate(bulk_index, bulk_type, msg):
     """ Decorates the msg with elasticsearch bulk format and adds index and message type"""
-    command = json.dumps({'index': {'_index': bulk_index, '_type': bulk_type}})
-    return '{0}\n{1}\n'.format(command, msg)
+    command = json_dumps({'index': {'_index': bulk_index, '_type': bulk_type}})
+    return command + b'\n' + msg + b'\n'
 
 def format_as_json(msg):
-    return json.dumps(msg)
+    if fast_json:
+        return json_dumps(msg)
+    return _template_dumps(msg)
 
 def format_as_elasticsearch_bulk_json(bulk_index, bulk_type, msg):
     payload = format_as_json(msg)
     return elasticsearch_bulk_decorate(bulk_index, bulk_type, payload)
+
+def elasticsearch_bulk_header(bulk_index, bulk_type):
+    """ Encode the bulk command line once for a fixed index and message type"""
+    return json_dumps({'index': {'_index': bulk_index, '_type': bulk_type}}) + b'\n'
+
+def format_as_elasticsearch_bulk_json_cached(header, msg):
+    """ Like format_as_elasticsearch_bulk_json, but with a pre-encoded header"""
+    return header + format_as_json(msg) + b'\n'
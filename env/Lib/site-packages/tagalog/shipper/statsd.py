@@ -1,46 +1,92 @@
+import atexit
 import re
 import logging
 import socket
-import operator
-from functools import reduce
+import time
 
 from tagalog.shipper.ishipper import IShipper
 from tagalog.shipper.shipper_error import ShipperError
 
 log = logging.getLogger(__name__)
 
+# time.monotonic is unaffected by system clock adjustments, but only exists on
+# Python 3. Fall back to time.time elsewhere.
+_monotonic = getattr(time, 'monotonic', time.time)
 
-def get_from_msg(field, msg):
-    if(field in msg):
+_METRIC_FIELD_RE = re.compile(r'%{([^}]*)}')
+
+# statsd accepts multiple newline-separated metrics per datagram; keep packets
+# below a conservative ethernet MTU payload to avoid fragmentation.
+_MAX_PACKET = 1400
+
+
+def _lookup(msg, field, parts):
+    if field in msg:
         return msg[field]
-    else:
-        pieces = field.split('.')
-        # fetch from nested dict
-        return reduce(operator.getitem, pieces, msg)
+    # fetch from nested dict
+    for p in parts:
+        msg = msg[p]
+    return msg
+
+
+def get_from_msg(field, msg):
+    return _lookup(msg, field, field.split('.'))
 
 
 class StatsdShipper(IShipper):
-    def __init__(self, metric, host='127.0.0.1', port='8125'):
+    def __init__(self, metric, host='127.0.0.1', port='8125', flush_interval=0.5):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.metric = metric
+        self.flush_interval = float(flush_interval)
+        # Parse the metric template once: a list of (field, parts) lookups and
+        # (None, literal) segments. Realising a metric then costs only dict
+        # lookups and a join, with no regex work per message.
+        self._segments = []
+        pos = 0
+        for m in _METRIC_FIELD_RE.finditer(metric):
+            if m.start() > pos:
+                self._segments.append((None, metric[pos:m.start()]))
+            field = m.group(1)
+            self._segments.append((field, field.split('.')))
+            pos = m.end()
+        if pos < len(metric):
+            self._segments.append((None, metric[pos:]))
         portnum = int(port)
         self.sock.connect((host, portnum))
 
+        self._buf = []
+        self._buf_len = 0
+        self._last_flush = _monotonic()
+        atexit.register(self.close)
+
     def ship(self, msg):
         try:
             real_msg = "%s:%s" % (self.__realised_metric(msg), self._statsd_msg(msg))
-            self.sock.send(real_msg.encode('utf-8'))
-        except socket.error as e:
-            log.warn("Could not ship message via StatsdShipper: {0}".format(e))
         except KeyError as e:
             log.warn("Could not ship message via StatsdShipper: key {0} not found in message when constructing metric {1}".format(e,self.metric))
+            return
+        data = real_msg.encode('utf-8')
+        if self._buf and self._buf_len + len(data) + 1 > _MAX_PACKET:
+            self.flush()
+        self._buf.append(data)
+        self._buf_len += len(data) + 1
+        if _monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Send all buffered metrics as one multi-metric UDP packet"""
+        if self._buf:
+            try:
+                self.sock.send(b'\n'.join(self._buf))
+            except socket.error as e:
+                log.warn("Could not ship message via StatsdShipper: {0}".format(e))
+            del self._buf[:]
+            self._buf_len = 0
+        self._last_flush = _monotonic()
+
+    def close(self):
+        self.flush()
 
     def __realised_metric(self, msg):
-        def replace_metric_field(match):
-            field = match.group(1)
-            value = get_from_msg(field,msg)
-            return str(value)
-
-        pattern = r'%{([^}]*)}'
-        realised_metric = re.sub(pattern, replace_metric_field, self.metric)
-        return realised_metric
+        return ''.join(segment if field is None else str(_lookup(msg, field, segment))
+                       for field, segment in self._segments)
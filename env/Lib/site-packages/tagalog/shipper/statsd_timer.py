@@ -1,11 +1,13 @@
-from tagalog.shipper.statsd import StatsdShipper, get_from_msg
+from tagalog.shipper.statsd import StatsdShipper, _lookup
 
 
 class StatsdTimerShipper(StatsdShipper):
     def __init__(self, metric, timed_field, host='127.0.0.1', port='8125'):
         self.timed_field = timed_field
+        # timed_field never changes, so split the dotted path once
+        self._timed_field_parts = timed_field.split('.')
         super(StatsdTimerShipper, self).__init__(metric, host, port)
 
     def _statsd_msg(self, msg):
-        timed_value = get_from_msg(self.timed_field, msg)
+        timed_value = _lookup(msg, self.timed_field, self._timed_field_parts)
         return '%f|ms' % timed_value
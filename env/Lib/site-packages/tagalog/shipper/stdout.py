@@ -1,6 +1,8 @@
-import json
+import sys
 
-from tagalog.shipper.formatter import format_as_json, format_as_elasticsearch_bulk_json
+from tagalog.shipper.formatter import (elasticsearch_bulk_header,
+                                       format_as_elasticsearch_bulk_json_cached,
+                                       format_as_json)
 from tagalog.shipper.ishipper import IShipper
 
 class StdoutShipper(IShipper):
@@ -8,11 +10,14 @@ class StdoutShipper(IShipper):
         self.bulk = bulk
         self.bulk_index = bulk_index
         self.bulk_type = bulk_type
-
+        # bulk_index/bulk_type never change, so encode the bulk command line once
+        self._bulk_header = elasticsearch_bulk_header(bulk_index, bulk_type)
+        # Payloads are bytes; write them to the underlying binary stream.
+        self._out = getattr(sys.stdout, 'buffer', sys.stdout)
 
     def ship(self, msg):
         if self.bulk:
-            payload = format_as_elasticsearch_bulk_json(self.bulk_index,self.bulk_type,msg)
+            payload = format_as_elasticsearch_bulk_json_cached(self._bulk_header, msg)
         else:
             payload = format_as_json(msg)
-        print(payload)
+        self._out.write(payload + b'\n')
@@ -0,0 +1,21 @@
+# Generated by Django 4.1 on 2026-08-27 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('onlinecourse', '0003_auto_20220822_2025'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='choice',
+            index=models.Index(fields=['question', 'correct'], name='onlinecours_questio_3e490d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['user', 'course'], name='onlinecours_user_id_2ad52a_idx'),
+        ),
+    ]
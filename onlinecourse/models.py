@@ -94,6 +94,10 @@ class Enrollment(models.Model):
     mode = models.CharField(max_length=5, choices=COURSE_MODES, default=AUDIT)
     rating = models.FloatField(default=5.0)
 
+    class Meta:
+        # The enroll and submit views both filter on (user, course)
+        indexes = [models.Index(fields=['user', 'course'])]
+
 
 # <HINT> Create a Question Model with:
     # Used to persist question content for a course
@@ -130,6 +134,10 @@ class Choice(models.Model):
     correct = models.BooleanField(default=False)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
 
+    class Meta:
+        # Exam scoring groups the choices of a question by correctness
+        indexes = [models.Index(fields=['question', 'correct'])]
+
 # <HINT> The submission model
 # One enrollment could have multiple submission
 # One submission could have multiple choices
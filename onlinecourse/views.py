@@ -1,16 +1,18 @@
-from django.shortcuts import render
 from django.http import HttpResponseRedirect
 # <HINT> Import any new Models here
 from .models import Course, Enrollment, Question, Choice, Submission
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404, render, redirect
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q
 from django.urls import reverse
 from django.views import generic
 from django.contrib.auth import login, logout, authenticate
 import logging
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
-logger.info("Houston, we have a %s", "interesting problem", exc_info=1)
 # Create your views here.
 
 
@@ -61,16 +63,6 @@ def logout_request(request):
     return redirect('onlinecourse:index')
 
 
-def check_if_enrolled(user, course):
-    is_enrolled = False
-    if user.id is not None:
-        # Check if user enrolled
-        num_results = Enrollment.objects.filter(user=user, course=course).count()
-        if num_results > 0:
-            is_enrolled = True
-    return is_enrolled
-
-
 # CourseListView
 class CourseListView(generic.ListView):
     template_name = 'onlinecourse/course_list_bootstrap.html'
@@ -78,11 +70,19 @@ class CourseListView(generic.ListView):
 
     def get_queryset(self):
         user = self.request.user
-        courses = Course.objects.order_by('-total_enrollment')[:10]
-        for course in courses:
-            if user.is_authenticated:
-                course.is_enrolled = check_if_enrolled(user, course)
-        return courses
+        # Project just the columns the course cards render; anything else
+        # (e.g. pub_date) stays out of the SELECT
+        courses = Course.objects.only(
+            'id', 'name', 'description', 'image', 'total_enrollment'
+        ).order_by('-total_enrollment')
+        # Anonymous users can never be enrolled, so skip the annotation
+        # entirely and serve the plain top-10 list
+        if not user.is_authenticated:
+            return courses[:10]
+        # Let the DB compute the flag with an EXISTS subquery per row:
+        # the courses arrive with is_enrolled already set, in one query
+        enrolled = Enrollment.objects.filter(user=user, course=OuterRef('pk'))
+        return courses.annotate(is_enrolled=Exists(enrolled))[:10]
 
 
 class CourseDetailView(generic.DetailView):
@@ -94,12 +94,17 @@ def enroll(request, course_id):
     course = get_object_or_404(Course, pk=course_id)
     user = request.user
 
-    is_enrolled = check_if_enrolled(user, course)
-    if not is_enrolled and user.is_authenticated:
-        # Create an enrollment
-        Enrollment.objects.create(user=user, course=course, mode='honor')
-        course.total_enrollment += 1
-        course.save()
+    if user.is_authenticated:
+        # get_or_create collapses the separate enrolled check and insert
+        # into one idempotent lookup-or-insert
+        _, created = Enrollment.objects.get_or_create(user=user, course=course,
+                                                      defaults={'mode': 'honor'})
+        if created:
+            # One atomic UPDATE ... SET total_enrollment = total_enrollment + 1;
+            # safe under concurrent enrolls and rewrites only this column
+            Course.objects.filter(pk=course_id).update(total_enrollment=F('total_enrollment') + 1)
+            # The user's cached course-list fragment shows stale enrollment state now
+            cache.delete(make_template_fragment_key('course_list', [user.id]))
 
     return HttpResponseRedirect(reverse(viewname='onlinecourse:course_details', args=(course.id,)))
 
@@ -111,32 +116,23 @@ def enroll(request, course_id):
          # Collect the selected choices from exam form
          # Add each selected choice object to the submission object
          # Redirect to show_exam_result with the submission id
+# One transaction (and one commit/fsync) for the submission insert plus
+# its m2m rows, instead of an implicit transaction per statement
+@transaction.atomic
 def submit(request, course_id):
     user = request.user
-    course = get_object_or_404(Course, pk=course_id)
-    enrollment = get_object_or_404(Enrollment.objects.filter(user=user, course=course))
+    # One direct lookup: no separate Course fetch, and no evaluating a
+    # filtered queryset just to wrap it in get_object_or_404
+    enrollment = get_object_or_404(Enrollment, user=user, course_id=course_id)
     submission = Submission.objects.create(enrollment=enrollment)
-    
-    submitted_answers = [] # currently not in use
-    for key in request.POST:
-        if key.startswith('choice'):
-            value = request.POST[key]
-            choice_id = int(value)
-            this_choice=Choice.objects.get(pk=choice_id)
-            submitted_answers.append(choice_id) # currently not in use
-            submission.choices.add(this_choice) #= choice_id # add each collected choice object to the submission object 
-    #return submitted_answers
-    return HttpResponseRedirect(reverse(viewname='onlinecourse:show_exam_result', args=(course.id, submission.id)))
-
-# <HINT> A example method to collect the selected choices from the exam form from the request object
-#def extract_answers(request):
-#    submitted_anwsers = []
-#    for key in request.POST:
-#        if key.startswith('choice'):
-#            value = request.POST[key]
-#            choice_id = int(value)
-#            submitted_anwsers.append(choice_id)
-#    return submitted_anwsers
+
+    # Every checkbox posts under the single name "choice", so getlist()
+    # hands back all selected ids without scanning the POST keys. m2m
+    # add() accepts primary keys directly and bulk-inserts them in one
+    # statement, so there is no need to SELECT each Choice first
+    choice_ids = [int(value) for value in request.POST.getlist('choice')]
+    submission.choices.add(*choice_ids)
+    return HttpResponseRedirect(reverse(viewname='onlinecourse:show_exam_result', args=(course_id, submission.id)))
 
 
 # <HINT> Create an exam result view to check if learner passed exam and show their question results and result for each question,
@@ -146,72 +142,71 @@ def submit(request, course_id):
         # For each selected choice, check if it is a correct answer or not
         # Calculate the total score
 
-def merge_two_dicts(x, y):
-    z = x.copy()   # start with keys and values of x
-    z.update(y)    # modifies z with keys and values of y
-    return z
-
-def show_exam_result(request,course_id, submission_id):
-    my_answers  = []
-    my_questions = []
-    question_choices= Choice.objects.none() #initialize empty choice-set...
-    question_choices_all = Choice.objects.none() # initialize empty choice-set
-    submission_choices= Choice.objects.none() #initialize empty choice-set...
-    right_answers = []
-    score = 0
+def show_exam_result(request, course_id, submission_id):
     counter = 0
-    grade = 0
     context = {}
     context['submission_id'] = submission_id
-    context['course_id'] = course_id  
+    context['course_id'] = course_id
     context['message'] = "This is a test view for Exam results of course{}".format(course_id)
-    
-    course_questions = Question.objects.filter(course__id = course_id)
-    
-    context['questions'] = course_questions.values()
-
-    for questions in course_questions:
-        question_choices = question_choices.union(Choice.objects.filter(question__id = questions.id, correct = True))
-        question_choices_all = question_choices_all.union(Choice.objects.filter(question__id = questions.id))
-        submission_choices = submission_choices.union(Choice.objects.filter(question__id = questions.id, submission__id = submission_id))
-
-        counter +=1
-        if list(question_choices.values()) == list(submission_choices.values()): # create two dictionaries via values out of object queryset
-            score +=1
-    
-    question_choices = question_choices.values()  # generate dictionary for context via values()
-    answer_ids = submission_choices.values_list('id')
-    submission_choices = submission_choices.values()
-    
-    grade = score/counter
-   
-    # submission_choices = Choice.objects.filter(submission__id = submission_id)
-    # for my_choices in submission_choices:
-    #     my_answers.append(my_choices.id)
-    # 
-
-    # #logger.info("Houston, we have a %s", "interesting problem", exc_info=1)
-    # course_questions = Question.objects.filter(course__id = course_id)
-    # for questions in course_questions:
-    #     my_questions.append(questions.id)
-    #     question_choices = Choice.objects.filter(question__id = questions.id)
-    #     for right_choices in question_choices:
-    #         if right_choices.correct == True:
-    #             right_answers.append(right_choices.id)
-    #     if right_answers in my_answers:
-    #         score +=1
-
-    context['score'] = score         
-    context['solutions'] = question_choices
-    context['answers'] = submission_choices
-    context['all_choices'] = question_choices_all.values()
-    context['grade'] = round((grade*100))
-    context['my_answer_ids'] = answer_ids
-   
 
-   
-    #return render(request, 'onlinecourse/user_registration_bootstrap.html', context)
-    return render(request, 'onlinecourse/exam_result_bootstrap.html', context)
+    submission = get_object_or_404(
+        Submission.objects.prefetch_related(
+            Prefetch('choices', queryset=Choice.objects.only('id'))),
+        pk=submission_id)
+    submitted_ids = {choice.id for choice in submission.choices.all()}
+
+    # One query for the questions plus one prefetch for all of their choices,
+    # instead of three filtered choice queries (and a growing UNION) per
+    # question. choice_content stays in the projection because the template
+    # renders it from these same prefetched objects.
+    course_questions = list(
+        Question.objects.filter(course_id=course_id).prefetch_related(
+            Prefetch('choice_set',
+                     queryset=Choice.objects.only('id', 'correct', 'question_id', 'choice_content'))))
+
+    # Pass the materialized list, not a lazy .values() queryset that would
+    # re-run its query each time the template iterates it
+    context['questions'] = course_questions
+
+    # Let the DB score the exam in one aggregate query: a question counts
+    # when every correct choice was picked and no incorrect one was. The
+    # counts need distinct=True because joining through the submission m2m
+    # table repeats choice rows.
+    picked = Q(choice__submission__id=submission_id)
+    score = Question.objects.filter(course_id=course_id).annotate(
+        num_correct=Count('choice', filter=Q(choice__correct=True), distinct=True),
+        num_picked_correct=Count('choice', filter=Q(choice__correct=True) & picked, distinct=True),
+        num_picked_wrong=Count('choice', filter=Q(choice__correct=False) & picked, distinct=True),
+    ).filter(num_picked_correct=F('num_correct'), num_picked_wrong=0).count()
+
+    # One template-ready dict per question: the template prints these
+    # flat instead of re-scanning all_choices per question and testing
+    # membership per choice
+    all_choices = []
+    results = []
+    for question in course_questions:
+        choices = question.choice_set.all()
+        all_choices.extend(choices)
+        counter += 1
+        results.append({
+            'question': question,
+            'choices': [{'id': choice.id,
+                         'text': choice.choice_content,
+                         'correct': choice.correct,
+                         'picked': choice.id in submitted_ids}
+                        for choice in choices],
+        })
 
+    grade = score/counter
 
+    context['results'] = results
+    context['score'] = score
+    context['solutions'] = [choice for choice in all_choices if choice.correct]
+    context['answers'] = [choice for choice in all_choices if choice.id in submitted_ids]
+    context['all_choices'] = all_choices
+    context['grade'] = round((grade*100))
+    # An evaluated set of plain ids: O(1) template membership checks, no
+    # re-run query and no 1-tuples to unpack
+    context['my_answer_ids'] = submitted_ids
 
+    return render(request, 'onlinecourse/exam_result_bootstrap.html', context)